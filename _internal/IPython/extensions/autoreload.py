@@ -57,6 +57,18 @@ The following magic commands are provided:
   standard out. ``--log`` or ``-l`` will do it to the log at INFO level; both can be used
   simultaneously.
 
+  Adding ``--profile`` records, for every check, the time spent checking,
+  the number of modules stat'ed and reloaded, the time of each reload and the
+  number of functions and classes patched.
+
+  Adding ``--background`` or ``-b`` looks for changed modules in a background
+  thread while waiting for input; executing a cell then only reloads the
+  modules that were already found to be changed.
+
+``%autoreload stats``
+
+    Show a summary of the statistics recorded with ``--profile``.
+
 ``%aimport``
 
     List modules which are to be automatically imported or not to be imported.
@@ -89,6 +101,10 @@ following things to work:
   calling 'c.foo()' on an object 'c' created before the reload causes
   the new code for 'foo' to be executed.
 
+- Functions and classes whose definition did not change are not upgraded;
+  an unchanged class that only the module itself refers to stays the same
+  object across reloads, and so do the classes of its existing instances.
+
 Some of the known remaining caveats are:
 
 - Replacing code objects does not always succeed: changing a @property
@@ -128,11 +144,14 @@ __skip_doctest__ = True
 
 import os
 import sys
+import threading
+import time
 import traceback
 import types
 import weakref
 import gc
 import logging
+from collections import deque
 from importlib import import_module, reload
 from importlib.util import source_from_cache
 
@@ -141,6 +160,24 @@ from importlib.util import source_from_cache
 # ------------------------------------------------------------------------------
 
 
+class CheckStats:
+    """Timings and counters gathered during one `ModuleReloader.check` call"""
+
+    def __init__(self):
+        self.check_time = 0.0
+        self.stat_count = 0
+        # [(module-name, seconds spent in superreload), ...]
+        self.reloaded = []
+        self.instances_time = 0.0
+        self.functions = 0
+        self.classes = 0
+
+
+# Statistics of the profiled check running on this thread, for the update_*
+# functions that superreload calls
+_profiling = threading.local()
+
+
 class ModuleReloader:
     enabled = False
     """Whether this reloader is enabled"""
@@ -151,6 +188,9 @@ class ModuleReloader:
     autoload_obj = False
     """Autoreload all modules AND autoload all new objects"""
 
+    profile = False
+    """Record a `CheckStats` in 'stats' for every check"""
+
     def __init__(self, shell=None):
         # Modules that failed to reload: {module: mtime-on-failed-reload, ...}
         self.failed = {}
@@ -162,13 +202,21 @@ class ModuleReloader:
         self.old_objects = {}
         # Module modification timestamps
         self.modules_mtimes = {}
+        # Statistics of the most recent profiled checks
+        self.stats = deque(maxlen=1000)
+        # Statistics of the profiled check in progress, and its thread
+        self._active_stats = None
+        self._active_thread = None
         self.shell = shell
 
         # Reporting callable for verbosity
         self._report = lambda msg: None  # by default, be quiet.
 
-        # Cache module modification times
-        self.check(check_all=True, do_reload=False)
+        # Modules already imported, and when: rather than caching all their
+        # modification times now, a module's source is only stat'ed when it
+        # is first checked, and reloaded if it changed since this time.
+        self._preloaded = set(sys.modules)
+        self._created = time.time()
 
     def mark_module_skipped(self, module_name):
         """Skip reloading the named module in the future"""
@@ -223,6 +271,10 @@ class ModuleReloader:
             except ValueError:
                 return None, None
 
+        stats = self._active_stats
+        if stats is not None and self._active_thread == threading.get_ident():
+            # not counting the scans of a ModuleWatcher thread
+            stats.stat_count += 1
         try:
             pymtime = os.stat(py_filename).st_mtime
         except OSError:
@@ -230,17 +282,20 @@ class ModuleReloader:
 
         return py_filename, pymtime
 
-    def check(self, check_all=False, do_reload=True):
-        """Check whether some modules need to be reloaded."""
-
-        if not self.enabled and not check_all:
-            return
-
+    def modules_to_check(self, check_all=False):
+        """Names of the modules a check looks at"""
         if check_all or self.check_all:
-            modules = list(sys.modules.keys())
-        else:
-            modules = list(self.modules.keys())
+            return list(sys.modules.keys())
+        return list(self.modules.keys())
+
+    def changed_modules(self, modules):
+        """Yield (modname, module, py_filename, pymtime) for every module in
+        `modules` whose source changed since it was last seen.
 
+        Modules seen for the first time only have their mtime cached, unless
+        they were imported before the reloader was created and modified
+        since.
+        """
         for modname in modules:
             m = sys.modules.get(modname, None)
 
@@ -255,22 +310,60 @@ class ModuleReloader:
                 if pymtime <= self.modules_mtimes[modname]:
                     continue
             except KeyError:
-                self.modules_mtimes[modname] = pymtime
-                continue
-            else:
-                if self.failed.get(py_filename, None) == pymtime:
+                if modname not in self._preloaded or pymtime <= self._created:
+                    self.modules_mtimes[modname] = pymtime
                     continue
+                # imported before the reloader was created, modified since
+
+            if self.failed.get(py_filename, None) == pymtime:
+                continue
+
+            yield modname, m, py_filename, pymtime
+
+    def check(self, check_all=False, do_reload=True, modules=None):
+        """Check whether some modules need to be reloaded.
+
+        If `modules` is given, only those module names are checked.
+        """
+
+        if not self.enabled and not check_all:
+            return
 
+        if modules is None:
+            modules = self.modules_to_check(check_all)
+
+        if not self.profile:
+            self._check(modules, do_reload)
+            return
+
+        self._active_stats = _profiling.stats = stats = CheckStats()
+        self._active_thread = threading.get_ident()
+        start = time.perf_counter()
+        try:
+            self._check(modules, do_reload)
+        finally:
+            self._active_stats = _profiling.stats = None
+            self._active_thread = None
+            stats.check_time = time.perf_counter() - start
+            self.stats.append(stats)
+
+    def _check(self, modules, do_reload):
+        for modname, m, py_filename, pymtime in self.changed_modules(modules):
             self.modules_mtimes[modname] = pymtime
 
             # If we've reached this point, we should try to reload the module
             if do_reload:
                 self._report(f"Reloading '{modname}'.")
+                start = time.perf_counter()
                 try:
                     if self.autoload_obj:
                         superreload(m, reload, self.old_objects, self.shell)
                     else:
                         superreload(m, reload, self.old_objects)
+                    if self._active_stats is not None:
+                        self._active_stats.reloaded.append(
+                            (modname, time.perf_counter() - start)
+                        )
                     if py_filename in self.failed:
                         del self.failed[py_filename]
                 except:
@@ -283,6 +376,150 @@ class ModuleReloader:
                     self.failed[py_filename] = pymtime
 
 
+class ImportRecorder:
+    """Meta path finder recording the names of the modules being imported.
+
+    It never finds a module itself: placed first on `sys.meta_path`, it is
+    asked about every module that is not in `sys.modules` yet, and lets the
+    other finders do the actual import. Every consumer registered with
+    `watch` collects the names asked for in a set of its own, which `take`
+    empties; the recorder is only on `sys.meta_path` while someone watches.
+    """
+
+    def __init__(self):
+        # consumer -> set of the names asked for since its last take()
+        self._names = weakref.WeakKeyDictionary()
+
+    def find_spec(self, fullname, path=None, target=None):
+        for names in self._names.values():
+            names.add(fullname)
+        return None
+
+    def watch(self, consumer):
+        """Record imports for consumer, installing the recorder if needed"""
+        self._names.setdefault(consumer, set())
+        if not any(finder is self for finder in sys.meta_path):
+            sys.meta_path.insert(0, self)
+
+    def unwatch(self, consumer):
+        """Stop recording imports for consumer, removing the recorder from
+        `sys.meta_path` if nobody else watches"""
+        self._names.pop(consumer, None)
+        if not self._names:
+            sys.meta_path[:] = [f for f in sys.meta_path if f is not self]
+
+    def take(self, consumer):
+        """Return the names recorded for consumer since the last call"""
+        names = self._names.get(consumer)
+        if not names:
+            return ()
+        self._names[consumer] = set()
+        return names
+
+
+def import_recorder():
+    """Return the `ImportRecorder` of `sys.meta_path`, or a new one"""
+    for finder in sys.meta_path:
+        if isinstance(finder, ImportRecorder):
+            return finder
+    return ImportRecorder()
+
+
+class ModuleWatcher:
+    """Look for changed modules in a background thread.
+
+    The thread only stats module sources; changed modules are collected and
+    reloaded on the main thread by `apply`, which costs nothing when no
+    module changed. Scanning is suspended between `pause` and `resume`, so
+    that the thread doesn't compete with the code being executed.
+    """
+
+    interval = 1.0
+    """Seconds between two scans"""
+
+    def __init__(self, reloader):
+        self.reloader = reloader
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stop = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Start scanning in the background, if not already doing so"""
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop,), name="autoreload", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread; pending reloads are kept"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._idle.set()
+        self._thread = None
+
+    def pause(self):
+        """Stop scanning until `resume` is called, e.g. while a cell runs"""
+        self._idle.clear()
+
+    def resume(self):
+        """Scan again after `pause`"""
+        self._idle.set()
+
+    def wake(self):
+        """Scan now instead of waiting for the next interval"""
+        self._wake.set()
+
+    def scan(self):
+        """Collect the modules whose source changed since the last check"""
+        reloader = self.reloader
+        if not reloader.enabled:
+            return
+        changed = [
+            modname
+            for modname, _, _, _ in reloader.changed_modules(
+                reloader.modules_to_check()
+            )
+        ]
+        if changed:
+            with self._lock:
+                self._pending.update(changed)
+
+    def apply(self):
+        """Reload the modules found changed by the background scans"""
+        if not self._pending:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        self.reloader.check(modules=sorted(pending))
+
+    def _run(self, stop):
+        while not stop.is_set():
+            self._idle.wait()
+            if stop.is_set():
+                break
+            try:
+                self.scan()
+            except Exception:
+                # sys.modules or a module may change under our feet; the
+                # next scan will see a consistent state.
+                pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
 # ------------------------------------------------------------------------------
 # superreload
 # ------------------------------------------------------------------------------
@@ -300,6 +537,9 @@ func_attrs = [
 
 def update_function(old, new):
     """Upgrade the code object of a function"""
+    stats = getattr(_profiling, "stats", None)
+    if stats is not None:
+        stats.functions += 1
     for name in func_attrs:
         try:
             setattr(old, name, getattr(new, name))
@@ -311,6 +551,9 @@ def update_instances(old, new):
     """Use garbage collector to find all instances that refer to the old
     class definition and update their __class__ to point to the new class
     definition"""
+    stats = getattr(_profiling, "stats", None)
+    if stats is not None:
+        start = time.perf_counter()
 
     refs = gc.get_referrers(old)
 
@@ -318,10 +561,16 @@ def update_instances(old, new):
         if type(ref) is old:
             object.__setattr__(ref, "__class__", new)
 
+    if stats is not None:
+        stats.instances_time += time.perf_counter() - start
+
 
 def update_class(old, new):
     """Replace stuff in the __dict__ of a class, and upgrade
     method code objects, and add new methods, if any"""
+    stats = getattr(_profiling, "stats", None)
+    if stats is not None:
+        stats.classes += 1
     for key in list(old.__dict__.keys()):
         old_obj = getattr(old, key)
         try:
@@ -395,6 +644,281 @@ def update_generic(a, b):
     return False
 
 
+# ------------------------------------------------------------------------------
+# Fingerprints of functions and classes
+# ------------------------------------------------------------------------------
+
+
+class _NoFingerprint(Exception):
+    pass
+
+
+_atomic_types = (type(None), bool, int, float, complex, str, bytes, type(Ellipsis))
+
+# class attributes that change when the class moves in its file
+_class_attrs_skipped = {"__firstlineno__"}
+
+
+def code_fingerprint(code, depth=0):
+    """What matters in a code object, leaving out its file and line numbers"""
+    return (
+        code.co_code,
+        tuple(_fingerprint(const, depth) for const in code.co_consts),
+        code.co_names,
+        code.co_varnames,
+        code.co_freevars,
+        code.co_cellvars,
+        code.co_argcount,
+        code.co_posonlyargcount,
+        code.co_kwonlyargcount,
+        code.co_flags,
+        getattr(code, "co_exceptiontable", None),
+    )
+
+
+def _fingerprint(obj, depth):
+    if depth > 20:
+        raise _NoFingerprint
+    depth += 1
+
+    typ = type(obj)
+    if typ in _atomic_types:
+        return (typ.__name__, obj)
+    if typ is tuple:
+        return ("tuple", tuple(_fingerprint(o, depth) for o in obj))
+    if typ is frozenset:
+        return ("frozenset", frozenset(_fingerprint(o, depth) for o in obj))
+    if typ is dict:
+        return (
+            "dict",
+            tuple(
+                (_fingerprint(k, depth), _fingerprint(v, depth)) for k, v in obj.items()
+            ),
+        )
+    if typ is types.CodeType:
+        return code_fingerprint(obj, depth)
+    if typ is types.FunctionType:
+        cells = []
+        for cell in obj.__closure__ or ():
+            try:
+                cells.append(_fingerprint(cell.cell_contents, depth))
+            except ValueError:
+                cells.append("empty")
+        return (
+            "function",
+            code_fingerprint(obj.__code__, depth),
+            _fingerprint(obj.__defaults__, depth),
+            _fingerprint(obj.__kwdefaults__, depth),
+            _fingerprint(obj.__doc__, depth),
+            _fingerprint(obj.__dict__, depth),
+            tuple(cells),
+        )
+    if typ is staticmethod or typ is classmethod:
+        return (typ.__name__, _fingerprint(obj.__func__, depth))
+    if typ is property:
+        return (
+            "property",
+            _fingerprint(obj.fget, depth),
+            _fingerprint(obj.fset, depth),
+            _fingerprint(obj.fdel, depth),
+            _fingerprint(obj.__doc__, depth),
+        )
+    if isinstance(obj, type):
+        # only a reference: a class found in a function or an attribute may
+        # be the old or the new version of the same class
+        return ("class", obj.__module__, obj.__qualname__)
+    if typ is types.GetSetDescriptorType or typ is types.MemberDescriptorType:
+        return ("descriptor", obj.__name__)
+    raise _NoFingerprint
+
+
+def _is_nested(cls, owner):
+    return cls.__module__ == owner.__module__ and cls.__qualname__.startswith(
+        owner.__qualname__ + "."
+    )
+
+
+def _class_fingerprint(cls, depth):
+    if depth > 20:
+        raise _NoFingerprint
+    items = []
+    for key, value in cls.__dict__.items():
+        if key in _class_attrs_skipped:
+            continue
+        if isinstance(value, type) and _is_nested(value, cls):
+            items.append((key, _class_fingerprint(value, depth + 1)))
+        else:
+            items.append((key, _fingerprint(value, depth)))
+    return ("class", cls.__qualname__, tuple(items))
+
+
+def fingerprint(obj):
+    """Summarize the definition of a function or class.
+
+    The fingerprints of the old and new version of an object compare equal
+    if its definition did not change, except for line numbers. Returns None
+    for objects that can't be summarized, e.g. classes with mutable
+    attributes, which must then be assumed to have changed.
+    """
+    try:
+        if isinstance(obj, type):
+            return _class_fingerprint(obj, 0)
+        return _fingerprint(obj, 0)
+    except _NoFingerprint:
+        return None
+
+
+def unchanged(old, new):
+    """Whether old and new are the same definition, per `fingerprint`"""
+    fp = fingerprint(new)
+    return fp is not None and fp == fingerprint(old)
+
+
+def refresh_code(old, new):
+    """Give the functions of an unchanged definition the code objects of
+    their new version, which may only differ by their line numbers, and
+    their default arguments, which may refer to the new versions of the
+    module's objects"""
+    if isinstance2(old, new, types.FunctionType):
+        for name in ("__code__", "__defaults__", "__kwdefaults__"):
+            try:
+                setattr(old, name, getattr(new, name))
+            except (TypeError, ValueError):
+                pass
+    elif isinstance2(old, new, (staticmethod, classmethod)):
+        refresh_code(old.__func__, new.__func__)
+    elif isinstance2(old, new, property):
+        refresh_code(old.fget, new.fget)
+        refresh_code(old.fset, new.fset)
+        refresh_code(old.fdel, new.fdel)
+    elif isinstance2(old, new, type):
+        for key, value in old.__dict__.items():
+            new_value = new.__dict__.get(key)
+            if isinstance(value, type):
+                if isinstance(new_value, type) and _is_nested(value, old):
+                    refresh_code(value, new_value)
+            else:
+                refresh_code(value, new_value)
+
+
+def _unchanged_class(old_objs, new, kept):
+    """The old class to keep in place of class new, if it didn't change.
+
+    kept maps the new classes already replaced by their old version.
+    """
+    distinct = {id(obj): obj for obj in old_objs}
+    if len(distinct) != 1:
+        return None
+    (old,) = distinct.values()
+    if not isinstance(old, type):
+        return None
+    if kept.get(type(new), type(new)) is not type(old):
+        return None
+    if len(old.__bases__) != len(new.__bases__):
+        return None
+    for new_base, old_base in zip(new.__bases__, old.__bases__):
+        if kept.get(new_base, new_base) is not old_base:
+            return None
+    if not unchanged(old, new):
+        return None
+    return old
+
+
+def _closure_cells(obj):
+    if isinstance(obj, (staticmethod, classmethod)):
+        obj = obj.__func__
+    if isinstance(obj, property):
+        for func in (obj.fget, obj.fset, obj.fdel):
+            yield from _closure_cells(func)
+    elif isinstance(obj, types.FunctionType):
+        yield from obj.__closure__ or ()
+
+
+def _referenced_elsewhere(module, classes):
+    """The classes of `classes` referenced from anything else than the
+    namespace of module, their own definition and the module-level classes
+    and instances that `_use_kept_classes` fixes up.
+
+    Such references, e.g. in a registry or a default argument, would be
+    left pointing at a class that is no longer the module's if the old
+    version of the class were kept.
+    """
+    allowed = {id(module.__dict__), id(classes)}
+    frame = sys._getframe()
+    while frame is not None:
+        allowed.add(id(frame))
+        frame = frame.f_back
+    for obj in module.__dict__.values():
+        if isinstance(obj, type):
+            allowed.update((id(obj), id(obj.__bases__), id(obj.__mro__)))
+            for value in obj.__dict__.values():
+                if type(value) in (
+                    types.GetSetDescriptorType,
+                    types.MemberDescriptorType,
+                ):
+                    allowed.add(id(value))
+                else:
+                    # the __class__ cells of methods using super()
+                    allowed.update(id(cell) for cell in _closure_cells(value))
+        elif type(obj) in classes:
+            allowed.add(id(obj))
+
+    referenced = set()
+    for ref in gc.get_referrers(*classes):
+        if id(ref) in allowed:
+            continue
+        for obj in gc.get_referents(ref):
+            if isinstance(obj, type) and obj in classes:
+                referenced.add(obj)
+    return referenced
+
+
+def _kept_classes(module, old_objects_by_name):
+    """Map the new classes of module that didn't change to their old version.
+
+    A class is only kept if nothing but the module refers to its new version,
+    and if its bases and metaclass are kept as well.
+    """
+    kept = {}
+    for name, old_objs in old_objects_by_name:
+        new = module.__dict__[name]
+        if isinstance(new, type):
+            old = _unchanged_class(old_objs, new, kept)
+            if old is not None:
+                kept[new] = old
+    if not kept:
+        return kept
+
+    dropped = _referenced_elsewhere(module, kept)
+    while dropped:
+        for cls in dropped:
+            del kept[cls]
+        dropped = {
+            cls
+            for cls in kept
+            if type(cls) in dropped or any(base in dropped for base in cls.__bases__)
+        }
+    return kept
+
+
+def _use_kept_classes(module, kept):
+    """Point the new objects of module at the old classes kept in place of
+    their new versions"""
+    for obj in list(module.__dict__.values()):
+        if isinstance(obj, type):
+            bases = tuple(kept.get(base, base) for base in obj.__bases__)
+            if any(a is not b for a, b in zip(bases, obj.__bases__)):
+                try:
+                    obj.__bases__ = bases
+                except TypeError:
+                    pass
+        elif type(obj) in kept:
+            try:
+                object.__setattr__(obj, "__class__", kept[type(obj)])
+            except TypeError:
+                pass
+
+
 class StrongRef:
     def __init__(self, obj):
         self.obj = obj
@@ -442,6 +966,10 @@ def superreload(module, reload=reload, old_objects=None, shell=None):
     - upgrades the code object of every old function and method
     - clears the module's namespace before reloading
 
+    Functions and classes whose definition did not change, according to
+    `fingerprint`, are left alone: an unchanged class that nothing else in
+    the reloaded module refers to is kept in the module in place of its new
+    version, so that its instances need no update.
     """
     if old_objects is None:
         old_objects = {}
@@ -474,8 +1002,11 @@ def superreload(module, reload=reload, old_objects=None, shell=None):
         module.__dict__.update(old_dict)
         raise
 
-    # iterate over all objects and update functions & classes
-    for name, new_obj in list(module.__dict__.items()):
+    # iterate over all objects and update functions & classes; only names
+    # are kept around, so that _kept_classes sees who else refers to them
+    old_objects_by_name = []
+    for name in list(module.__dict__):
+        new_obj = module.__dict__[name]
         key = (module.__name__, name)
         if key not in old_objects:
             # here 'shell' acts both as a flag and as an output var
@@ -488,21 +1019,128 @@ def superreload(module, reload=reload, old_objects=None, shell=None):
             shell.user_ns[name] = new_obj
 
         new_refs = []
+        old_objs = []
         for old_ref in old_objects[key]:
             old_obj = old_ref()
             if old_obj is None:
                 continue
             new_refs.append(old_ref)
-            update_generic(old_obj, new_obj)
+            old_objs.append(old_obj)
 
         if new_refs:
             old_objects[key] = new_refs
         else:
             del old_objects[key]
+        old_objects_by_name.append((name, old_objs))
+
+    kept = _kept_classes(module, old_objects_by_name)
+    for name, old_objs in old_objects_by_name:
+        new_obj = module.__dict__[name]
+        old_class = kept.get(new_obj) if isinstance(new_obj, type) else None
+        if old_class is not None:
+            refresh_code(old_class, new_obj)
+            module.__dict__[name] = old_class
+            continue
+
+        for old_obj in old_objs:
+            if isinstance2(old_obj, new_obj, types.FunctionType) and unchanged(
+                old_obj, new_obj
+            ):
+                refresh_code(old_obj, new_obj)
+                continue
+            update_generic(old_obj, new_obj)
+
+    if kept:
+        _use_kept_classes(module, kept)
 
     return module
 
 
+# ------------------------------------------------------------------------------
+# Profiling report
+# ------------------------------------------------------------------------------
+
+
+histogram_edges = [1e-4, 1e-3, 1e-2, 1e-1, 1.0]
+
+
+def _format_time(seconds):
+    if seconds < 1.0:
+        return "%.3g ms" % (seconds * 1e3)
+    return "%.3g s" % seconds
+
+
+def _histogram(values, width=40):
+    """Bucket durations in seconds on a log scale and draw them as bars"""
+    counts = [0] * (len(histogram_edges) + 1)
+    for value in values:
+        for i, edge in enumerate(histogram_edges):
+            if value < edge:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+
+    labels = ["< %s" % _format_time(edge) for edge in histogram_edges]
+    labels.append(">= %s" % _format_time(histogram_edges[-1]))
+    peak = max(counts) or 1
+    lines = []
+    for label, count in zip(labels, counts):
+        bar = "#" * (count * width // peak)
+        lines.append("  %10s | %-*s %d" % (label, width, bar, count))
+    return "\n".join(lines)
+
+
+def format_stats(stats):
+    """Summarize a sequence of `CheckStats` as a human readable report"""
+    stats = list(stats)
+    if not stats:
+        return "No autoreload statistics recorded; enable with %autoreload --profile."
+
+    check_times = [s.check_time for s in stats]
+    reloads = [r for s in stats for r in s.reloaded]
+    stat_counts = [s.stat_count for s in stats]
+
+    lines = [
+        "Autoreload statistics for the last %d checks:" % len(stats),
+        "  check time:        total %s, mean %s, max %s"
+        % (
+            _format_time(sum(check_times)),
+            _format_time(sum(check_times) / len(stats)),
+            _format_time(max(check_times)),
+        ),
+        "  modules stat'ed:   mean %.1f, max %d per check"
+        % (sum(stat_counts) / len(stats), max(stat_counts)),
+        "  modules reloaded:  %d" % len(reloads),
+    ]
+    if reloads:
+        slowest = max(reloads, key=lambda r: r[1])
+        lines.append(
+            "  superreload time:  total %s, max %s ('%s')"
+            % (
+                _format_time(sum(r[1] for r in reloads)),
+                _format_time(slowest[1]),
+                slowest[0],
+            )
+        )
+    lines.append(
+        "  update_instances:  %s"
+        % _format_time(sum(s.instances_time for s in stats))
+    )
+    lines.append(
+        "  patched:           %d functions, %d classes"
+        % (sum(s.functions for s in stats), sum(s.classes for s in stats))
+    )
+    lines.append("")
+    lines.append("check time histogram:")
+    lines.append(_histogram(check_times))
+    if reloads:
+        lines.append("")
+        lines.append("superreload time histogram:")
+        lines.append(_histogram([r[1] for r in reloads]))
+    return "\n".join(lines)
+
+
 # ------------------------------------------------------------------------------
 # IPython connectivity
 # ------------------------------------------------------------------------------
@@ -515,7 +1153,8 @@ class AutoreloadMagics(Magics):
         self._reloader = ModuleReloader(self.shell)
         self._reloader.check_all = False
         self._reloader.autoload_obj = False
-        self.loaded_modules = set(sys.modules)
+        self._watcher = ModuleWatcher(self._reloader)
+        self._imports = None
 
     @line_magic
     @magic_arguments.magic_arguments()
@@ -537,6 +1176,8 @@ class AutoreloadMagics(Magics):
 
              '3' or 'complete' - Same as 2/all, but also but also adds any new
              objects in the module.
+
+             'stats' - Show the statistics recorded with --profile.
              """,
     )
     @magic_arguments.argument(
@@ -553,6 +1194,19 @@ class AutoreloadMagics(Magics):
         default=False,
         help="Show autoreload activity using the logger",
     )
+    @magic_arguments.argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Record timing statistics of every check, see `%%autoreload stats`",
+    )
+    @magic_arguments.argument(
+        "-b",
+        "--background",
+        action="store_true",
+        default=False,
+        help="Look for changed modules in a background thread while waiting for input",
+    )
     def autoreload(self, line=""):
         r"""%autoreload => Reload modules automatically
 
@@ -575,10 +1229,21 @@ class AutoreloadMagics(Magics):
         Same as 2/all, but also but also adds any new objects in the module. See
         unit test at IPython/extensions/tests/test_autoreload.py::test_autoload_newly_added_objects
 
+        %autoreload stats
+        Show a summary of the statistics recorded with --profile.
+
         The optional arguments --print and --log control display of autoreload activity. The default
         is to act silently; --print (or -p) will print out the names of modules that are being
         reloaded, and --log (or -l) outputs them to the log at INFO level.
 
+        The optional argument --profile records, for every check, the time spent checking, the
+        number of modules stat'ed and reloaded, the time of each reload, the time spent updating
+        instances and the number of functions and classes patched.
+
+        The optional argument --background (or -b) looks for changed modules in a background
+        thread while the user is typing, so that executing a cell only reloads the modules that
+        were already found to be changed.
+
         Reloading Python modules in a reliable way is in general
         difficult, and unexpected things may occur. %autoreload tries to
         work around common pitfalls by replacing function code objects and
@@ -608,6 +1273,10 @@ class AutoreloadMagics(Magics):
         args = magic_arguments.parse_argstring(self.autoreload, line)
         mode = args.mode.lower()
 
+        if mode == "stats":
+            print(format_stats(self._reloader.stats))
+            return
+
         p = print
 
         logger = logging.getLogger("autoreload")
@@ -628,6 +1297,12 @@ class AutoreloadMagics(Magics):
         elif args.log is True:
             self._reloader._report = l
 
+        self._reloader.profile = args.profile
+        if args.background:
+            self._watcher.start()
+        else:
+            self._watcher.stop()
+
         if mode == "" or mode == "now":
             self._reloader.check(True)
         elif mode == "0" or mode == "off":
@@ -646,6 +1321,17 @@ class AutoreloadMagics(Magics):
             self._reloader.autoload_obj = True
         else:
             raise ValueError(f'Unrecognized autoreload mode "{mode}".')
+        self._record_imports(self._reloader.enabled)
+
+    def _record_imports(self, enabled):
+        """Start or stop recording the modules imported by the cells"""
+        if enabled:
+            if self._imports is None:
+                self._imports = import_recorder()
+            self._imports.watch(self)
+        elif self._imports is not None:
+            self._imports.unwatch(self)
+            self._imports = None
 
     @line_magic
     def aimport(self, parameter_s="", stream=None):
@@ -687,21 +1373,31 @@ class AutoreloadMagics(Magics):
                     self.shell.push({top_name: top_module})
 
     def pre_run_cell(self):
+        self._watcher.pause()
         if self._reloader.enabled:
             try:
-                self._reloader.check()
+                if self._watcher.running:
+                    self._watcher.apply()
+                else:
+                    self._reloader.check()
             except:
                 pass
 
     def post_execute_hook(self):
         """Cache the modification times of any modules imported in this execution"""
-        newly_loaded_modules = set(sys.modules) - self.loaded_modules
-        for modname in newly_loaded_modules:
-            _, pymtime = self._reloader.filename_and_mtime(sys.modules[modname])
-            if pymtime is not None:
-                self._reloader.modules_mtimes[modname] = pymtime
+        if self._imports is not None:
+            for modname in self._imports.take(self):
+                m = sys.modules.get(modname)
+                if m is None:
+                    # the import failed
+                    continue
+                _, pymtime = self._reloader.filename_and_mtime(m)
+                if pymtime is not None:
+                    self._reloader.modules_mtimes[modname] = pymtime
 
-        self.loaded_modules.update(newly_loaded_modules)
+        self._watcher.resume()
+        if self._watcher.running:
+            self._watcher.wake()
 
 
 def load_ipython_extension(ip):
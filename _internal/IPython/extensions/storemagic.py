@@ -8,17 +8,608 @@ To automatically restore stored variables at startup, add this to your
 :file:`ipython_config.py` file::
 
   c.StoreMagics.autorestore = True
+
+NumPy arrays and pandas DataFrames can be saved as ``.npy`` files in the
+profile's :file:`store` directory instead of being pickled, so that they are
+memory-mapped when restored::
+
+  c.StoreMagics.backend = 'binary'
+
+Variables saved this way are restored lazily: their name is bound to a
+placeholder which loads the value when a cell first uses it. To restore all
+variables lazily, so that startup doesn't depend on how much was stored::
+
+  c.StoreMagics.lazy_restore = True
+
+Code that gets hold of a placeholder without a cell naming it, such as a
+script run with ``%run -i``, loads the value as soon as it uses it, except
+for identity and ``type``/``isinstance`` checks, which see the placeholder.
+
+Large values that change little between two ``%store`` can be pickled into
+content-addressed chunk files, optionally compressed, so that storing them
+again only writes the chunks that changed::
+
+  c.StoreMagics.backend = 'chunked'
+  c.StoreMagics.compression = 'zlib'  # or 'lzma'
 """
 
 # Copyright (c) IPython Development Team.
 # Distributed under the terms of the Modified BSD License.
 
-import inspect, os, sys, textwrap
+import ast, glob, hashlib, inspect, lzma, operator, os, pickle, re, reprlib, shutil, sys, textwrap, time, zlib
 
 from IPython.core.error import UsageError
 from IPython.core.magic import Magics, magics_class, line_magic
 from IPython.testing.skipdoctest import skip_doctest
-from traitlets import Bool
+from traitlets import Bool, Enum
+
+
+def store_dir(ip):
+    """Directory holding the variables saved as files"""
+    return os.path.join(ip.profile_dir.location, 'store')
+
+
+class StoredReference(object):
+    """Marker base class of the references kept in the database to values
+    saved as files in `store_dir`; they have a ``load(ip)`` method."""
+
+
+class StoredFiles(StoredReference):
+    """Reference to a value saved as .npy files.
+
+    Arrays are saved with ``numpy.save`` and DataFrames as one ``.npy`` file
+    per column; both are memory-mapped (copy-on-write) when loaded.
+    """
+
+    def __init__(self, dirname, kind, typename):
+        self.dirname = dirname
+        self.kind = kind
+        self.typename = typename
+
+    def __repr__(self):
+        return "<%s saved in %s>" % (self.typename, self.dirname)
+
+    def load(self, ip):
+        path = os.path.join(store_dir(ip), self.dirname)
+        if self.kind == 'ndarray':
+            import numpy as np
+            return np.load(os.path.join(path, 'data.npy'), mmap_mode='c')
+        if self.kind == 'DataFrame':
+            return _load_frame(path)
+        raise ValueError("Unknown stored kind %r" % self.kind)
+
+
+def _save_frame(frame, path):
+    import numpy as np
+    meta = {'index': frame.index, 'columns': frame.columns, 'arrays': {}}
+    for i in range(frame.shape[1]):
+        column = frame.iloc[:, i]
+        if isinstance(column.dtype, np.dtype) and not column.dtype.hasobject:
+            np.save(os.path.join(path, '%d.npy' % i), column.to_numpy(),
+                    allow_pickle=False)
+        else:
+            meta['arrays'][i] = column.array
+    with open(os.path.join(path, 'frame.pkl'), 'wb') as f:
+        pickle.dump(meta, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _load_frame(path):
+    import numpy as np
+    import pandas as pd
+    with open(os.path.join(path, 'frame.pkl'), 'rb') as f:
+        meta = pickle.load(f)
+    data = {}
+    for i in range(len(meta['columns'])):
+        if i in meta['arrays']:
+            data[i] = meta['arrays'][i]
+        else:
+            data[i] = np.load(os.path.join(path, '%d.npy' % i), mmap_mode='c')
+    frame = pd.DataFrame(data, index=meta['index'], copy=False)
+    frame.columns = meta['columns']
+    return frame
+
+
+def _binary_kind(obj):
+    """'ndarray' or 'DataFrame' if obj can be saved as .npy files, else None"""
+    # Only look at modules that are already imported: if numpy isn't,
+    # obj can't be an array.
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(obj, np.ndarray):
+        return None if obj.dtype.hasobject else 'ndarray'
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(obj, pd.DataFrame):
+        return 'DataFrame'
+    return None
+
+
+def save_files(ip, name, obj):
+    """Save obj in the store directory and return its `StoredFiles`.
+
+    Returns None if obj has no binary format and must be pickled instead.
+    """
+    kind = _binary_kind(obj)
+    if kind is None:
+        return None
+
+    # Every save goes to a new directory: the previous one may still be
+    # memory-mapped, and can't be overwritten (or even removed, on Windows).
+    dirname = '%s.%x' % (name, time.time_ns())
+    root = store_dir(ip)
+    path = os.path.join(root, dirname)
+    tmp = path + '.tmp'
+    os.makedirs(tmp)
+    try:
+        if kind == 'ndarray':
+            import numpy as np
+            np.save(os.path.join(tmp, 'data.npy'), obj, allow_pickle=False)
+        else:
+            _save_frame(obj, tmp)
+        os.rename(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    remove_files(ip, name, keep=dirname)
+    return StoredFiles(dirname, kind, obj.__class__.__name__)
+
+
+CHUNK_SIZE = 1 << 20
+
+compressors = {
+    'none': (lambda data: data, lambda data: data, ''),
+    'zlib': (zlib.compress, zlib.decompress, '.z'),
+    'lzma': (lzma.compress, lzma.decompress, '.xz'),
+}
+
+
+class StoredChunks(StoredReference):
+    """Reference to a value pickled into content-addressed chunk files.
+
+    The value is pickled with protocol 5: the pickle itself and every
+    out-of-band buffer (e.g. the data of arrays and DataFrames) are
+    separate streams, each cut in chunks of `CHUNK_SIZE` bytes named after
+    the hash of their content. Storing a value again only writes the chunks
+    that changed.
+    """
+
+    def __init__(self, dirname, compression, streams, typename):
+        self.dirname = dirname
+        self.compression = compression
+        # [[chunk file name, ...], ...], the pickle stream first
+        self.streams = streams
+        self.typename = typename
+
+    def __repr__(self):
+        return "<%s saved in %s>" % (self.typename, self.dirname)
+
+    def chunks(self):
+        return {name for stream in self.streams for name in stream}
+
+    def load(self, ip):
+        path = os.path.join(store_dir(ip), self.dirname)
+        decompress = compressors[self.compression][1]
+        data = []
+        for stream in self.streams:
+            buf = bytearray()
+            for name in stream:
+                with open(os.path.join(path, name), 'rb') as f:
+                    buf += decompress(f.read())
+            data.append(buf)
+        return pickle.loads(data[0], buffers=data[1:])
+
+
+def _pickle_streams(obj):
+    buffers = []
+    try:
+        head = pickle.dumps(obj, 5, buffer_callback=buffers.append)
+        return [head] + [buf.raw() for buf in buffers]
+    except BufferError:
+        # a non-contiguous buffer: pickle everything in-band
+        return [pickle.dumps(obj, 5)]
+
+
+def save_chunks(ip, name, obj, compression='none'):
+    """Pickle obj into chunk files, writing only the chunks not yet saved.
+
+    Returns the `StoredChunks` and the number of bytes written. Chunks that
+    are no longer used are only removed by `prune_chunks`, once the new
+    reference is in the database.
+    """
+    compress, _, suffix = compressors[compression]
+    dirname = name + '.chunks'
+    path = os.path.join(store_dir(ip), dirname)
+    os.makedirs(path, exist_ok=True)
+    existing = set(os.listdir(path))
+
+    written = 0
+    streams = []
+    for data in _pickle_streams(obj):
+        data = memoryview(data).cast('B')
+        chunks = []
+        for start in range(0, len(data), CHUNK_SIZE):
+            chunk = data[start:start + CHUNK_SIZE]
+            chunk_name = hashlib.blake2b(chunk, digest_size=20).hexdigest() + suffix
+            if chunk_name not in existing:
+                compressed = compress(chunk)
+                tmp = os.path.join(path, chunk_name + '.tmp')
+                with open(tmp, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp, os.path.join(path, chunk_name))
+                existing.add(chunk_name)
+                written += len(compressed)
+            chunks.append(chunk_name)
+        streams.append(chunks)
+    return StoredChunks(dirname, compression, streams, obj.__class__.__name__), written
+
+
+def prune_chunks(ip, ref):
+    """Remove the chunk files of ref's directory that ref doesn't use"""
+    path = os.path.join(store_dir(ip), ref.dirname)
+    used = ref.chunks()
+    for chunk_name in os.listdir(path):
+        if chunk_name not in used:
+            try:
+                os.remove(os.path.join(path, chunk_name))
+            except OSError:
+                pass
+
+
+def _dir_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def _format_size(size):
+    for unit in ('bytes', 'kB', 'MB'):
+        if size < 1000:
+            break
+        size /= 1000
+    else:
+        unit = 'GB'
+    if unit == 'bytes':
+        return '%d %s' % (size, unit)
+    return '%.1f %s' % (size, unit)
+
+
+# Bounded repr of the values listed by %store, so that storing a large
+# container doesn't build its whole repr
+_short_repr = reprlib.Repr()
+_short_repr.maxlist = _short_repr.maxtuple = _short_repr.maxset = 10
+_short_repr.maxfrozenset = _short_repr.maxdeque = _short_repr.maxarray = 10
+_short_repr.maxdict = 5
+_short_repr.maxstring = _short_repr.maxlong = _short_repr.maxother = 50
+
+
+def describe(obj, size):
+    """Entry of the 'stored_index' database key for a newly stored value"""
+    shape = getattr(obj, 'shape', None)
+    if not isinstance(shape, tuple):
+        try:
+            shape = len(obj)
+        except Exception:
+            shape = None
+    return {
+        'type': obj.__class__.__name__,
+        'size': size,
+        'shape': shape,
+        'time': time.time(),
+        # what %store lists for the variable
+        'repr': _short_repr.repr(obj)[:50],
+    }
+
+
+def remove_files(ip, name, keep=None):
+    """Remove the files saved for variable name, except directory keep"""
+    root = store_dir(ip)
+    for path in glob.glob(os.path.join(glob.escape(root), glob.escape(name) + '.*')):
+        if os.path.basename(path) != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_variable(ip, name):
+    """Load stored variable name from the database"""
+    obj = ip.db['autorestore/' + name]
+    if isinstance(obj, StoredReference):
+        obj = obj.load(ip)
+    return obj
+
+
+class LazyValue(object):
+    """Placeholder for a restored variable that is loaded on first use.
+
+    The placeholder replaces itself in the user namespace with the actual
+    value as soon as a cell refers to its name, or an attribute of it is
+    looked up. Code reaching it another way, e.g. a script run with
+    ``%run -i``, also gets the value when it uses the usual operators,
+    ``len``, iteration, indexing, calls or ``numpy.asarray``; only identity
+    and ``type``/``isinstance`` checks see the placeholder.
+    """
+
+    def __init__(self, ip, name, typename=None):
+        self._ip = ip
+        self._name = name
+        self._typename = typename
+
+    def __repr__(self):
+        if self._typename is None:
+            return "<stored variable '%s', not loaded yet>" % self._name
+        return "<stored variable '%s' (%s), not loaded yet>" % (
+            self._name, self._typename)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def load(self):
+        """Load the value and bind it in place of the placeholder"""
+        try:
+            return self.__dict__['_value']
+        except KeyError:
+            pass
+        obj = load_variable(self._ip, self._name)
+        self.__dict__['_value'] = obj
+        ns = self._ip.user_ns
+        if ns.get(self._name) is self:
+            ns[self._name] = obj
+        return obj
+
+
+def _array(obj, *args, **kwargs):
+    import numpy as np
+    return np.asarray(obj, *args, **kwargs)
+
+
+def _forward(name, func, reflected=False):
+    """Method of LazyValue applying func to the loaded value"""
+    if reflected:
+        def method(self, other):
+            return func(other, self.load())
+    else:
+        def method(self, *args, **kwargs):
+            return func(self.load(), *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+for _name, _func in [
+        ('len', len), ('iter', iter), ('reversed', reversed),
+        ('contains', operator.contains), ('getitem', operator.getitem),
+        ('setitem', operator.setitem), ('delitem', operator.delitem),
+        ('call', lambda obj, *args, **kwargs: obj(*args, **kwargs)),
+        ('bool', bool), ('str', str), ('format', format), ('hash', hash),
+        ('index', operator.index), ('int', int), ('float', float),
+        ('complex', complex), ('neg', operator.neg), ('pos', operator.pos),
+        ('abs', abs), ('invert', operator.invert), ('array', _array),
+        ('eq', operator.eq), ('ne', operator.ne), ('lt', operator.lt),
+        ('le', operator.le), ('gt', operator.gt), ('ge', operator.ge)]:
+    setattr(LazyValue, '__%s__' % _name, _forward('__%s__' % _name, _func))
+
+for _name, _func in [
+        ('add', operator.add), ('sub', operator.sub), ('mul', operator.mul),
+        ('matmul', operator.matmul), ('truediv', operator.truediv),
+        ('floordiv', operator.floordiv), ('mod', operator.mod),
+        ('pow', operator.pow), ('lshift', operator.lshift),
+        ('rshift', operator.rshift), ('and', operator.and_),
+        ('xor', operator.xor), ('or', operator.or_)]:
+    setattr(LazyValue, '__%s__' % _name, _forward('__%s__' % _name, _func))
+    setattr(LazyValue, '__r%s__' % _name,
+            _forward('__r%s__' % _name, _func, reflected=True))
+
+del _name, _func
+
+
+_identifier = re.compile(r'[^\d\W]\w*')
+
+
+def _loaded_names(ip, cell):
+    """Names read by the Python code of cell, once transformed by IPython;
+    names only found in magics, strings, comments or ``del`` don't count"""
+    try:
+        tree = ast.parse(ip.transform_cell(cell))
+    except Exception:
+        # the cell won't run anyway
+        return set()
+    return {node.id for node in ast.walk(tree)
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+
+
+def load_lazy_variables(ip, cell):
+    """Load the placeholders of restored variables that cell reads"""
+    ns = ip.user_ns
+    # cheap pre-filter, so that most cells aren't parsed here
+    names = [name for name in set(_identifier.findall(cell))
+             if isinstance(ns.get(name), LazyValue)]
+    if not names:
+        return
+    loaded = _loaded_names(ip, cell)
+    for name in names:
+        value = ns.get(name)
+        if name in loaded and isinstance(value, LazyValue):
+            try:
+                value.load()
+            except Exception:
+                print("Unable to restore variable '%s', ignoring (use %%store -d to forget!)" % name)
+                print("The error was:", sys.exc_info()[0])
+
+
+# Rows written at a time when streaming DataFrames to a file
+FILE_CHUNK_ROWS = 10000
+
+
+def _is_frame(obj):
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(obj, (pd.DataFrame, pd.Series))
+
+
+def _is_array(obj):
+    np = sys.modules.get('numpy')
+    return np is not None and isinstance(obj, np.ndarray)
+
+
+def _write_text(obj, fil):
+    if not isinstance (obj, str):
+        from pprint import pprint
+        pprint(obj, fil)
+    else:
+        fil.write(obj)
+        if not obj.endswith('\n'):
+            fil.write('\n')
+
+
+def _write_csv(obj, fil):
+    if _is_frame(obj):
+        # no header when appending to a non-empty file
+        obj.to_csv(fil, header=fil.tell() == 0, chunksize=FILE_CHUNK_ROWS)
+    else:
+        import csv
+        writer = csv.writer(fil)
+        try:
+            for row in obj:
+                _check_row(row, 'a CSV row')
+                writer.writerow(row)
+        except (csv.Error, TypeError) as e:
+            raise UsageError("Can't write %s as CSV rows: %s" % (
+                obj.__class__.__name__, e)) from e
+
+
+def _check_row(row, what):
+    # iterating over a string would split it in characters
+    if isinstance(row, str):
+        raise UsageError("Can't write a string as %s, only sequences of "
+                         "values" % what)
+
+
+def _json_default(obj):
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def _write_jsonl(obj, fil):
+    import json
+    if _is_frame(obj):
+        for start in range(0, len(obj), FILE_CHUNK_ROWS):
+            lines = obj.iloc[start:start + FILE_CHUNK_ROWS].to_json(
+                orient='records', lines=True)
+            fil.write(lines if lines.endswith('\n') else lines + '\n')
+        return
+    items = obj.items() if isinstance(obj, dict) else obj
+    try:
+        for item in items:
+            _check_row(item, 'a JSON line')
+            fil.write(json.dumps(item, default=_json_default))
+            fil.write('\n')
+    except TypeError as e:
+        raise UsageError("Can't write %s as JSON lines: %s" % (
+            obj.__class__.__name__, e)) from e
+
+
+def _write_npy(obj, fil):
+    import numpy as np
+    np.save(fil, obj, allow_pickle=False)
+
+
+def _write_raw(obj, fil):
+    obj.tofile(fil)
+
+
+def _rows(obj, what):
+    """Rows of obj to check before writing them, unless obj is a one-shot
+    iterator, which the writers check as they go"""
+    if _is_frame(obj):
+        return ()
+    try:
+        it = iter(obj)
+    except TypeError as e:
+        raise UsageError("Can't write %s as %s" % (
+            obj.__class__.__name__, what)) from e
+    return () if it is obj else obj
+
+
+def _check_csv(obj):
+    for row in _rows(obj, 'CSV rows'):
+        _check_row(row, 'a CSV row')
+        try:
+            iter(row)
+        except TypeError as e:
+            raise UsageError("Can't write %s as CSV rows: %r is not a "
+                             "sequence" % (obj.__class__.__name__, row)) from e
+
+
+def _check_jsonl(obj):
+    items = obj.items() if isinstance(obj, dict) else obj
+    for item in _rows(items, 'JSON lines'):
+        _check_row(item, 'a JSON line')
+
+
+def _check_npy(obj):
+    if not _is_array(obj):
+        raise UsageError("Only NumPy arrays can be written as npy")
+
+
+def _check_raw(obj):
+    if not _is_array(obj):
+        raise UsageError("Only NumPy arrays can be written as raw data")
+
+
+# format -> (writer, check of the value before the file is opened,
+#            whether the file is binary, whether it can be appended to)
+file_formats = {
+    'text': (_write_text, None, False, True),
+    'csv': (_write_csv, _check_csv, False, True),
+    'jsonl': (_write_jsonl, _check_jsonl, False, True),
+    'npy': (_write_npy, _check_npy, True, False),
+    'raw': (_write_raw, _check_raw, True, True),
+}
+
+
+def _file_format(obj, fnam):
+    """Format to write obj to file fnam in when none is given"""
+    ext = os.path.splitext(fnam)[1].lower()[1:]
+    if ext in ('csv', 'jsonl', 'npy'):
+        return ext
+    if _is_frame(obj):
+        return 'csv'
+    return 'text'
+
+
+def write_to_file(obj, fnam, append=False, fmt=None):
+    """Write obj to file fnam, streaming it in the given format.
+
+    Formats are 'text' (pretty-printed), 'csv' (DataFrames in chunks of
+    rows, or any sequence of rows), 'jsonl' (one JSON value per line, for
+    DataFrames, dicts and sequences), 'npy' and 'raw' (NumPy arrays).
+    Strings are always written verbatim, whatever the format.
+    """
+    if fmt is None:
+        fmt = _file_format(obj, fnam)
+    if fmt not in file_formats:
+        raise UsageError("Unknown file format '%s', use one of: %s" % (
+            fmt, ', '.join(file_formats)))
+    if isinstance(obj, str):
+        fmt = 'text'
+    writer, check, binary, appendable = file_formats[fmt]
+    if append and not appendable:
+        raise UsageError("Can't append to a file in %s format" % fmt)
+    # a value the format rejects must leave an existing file as it was
+    if check is not None:
+        check(obj)
+
+    mode = 'a' if append else 'w'
+    if binary:
+        fil = open(fnam, mode + 'b')
+    else:
+        fil = open(fnam, mode, encoding="utf-8", newline='' if fmt == 'csv' else None)
+    with fil:
+        start = fil.tell() if append and fil.seekable() else None
+        try:
+            writer(obj, fil)
+        except BaseException:
+            # e.g. a one-shot iterator rejected while writing
+            if start is not None:
+                fil.seek(start)
+                fil.truncate()
+            raise
+    return fmt
 
 
 def restore_aliases(ip, alias=None):
@@ -32,11 +623,23 @@ def restore_aliases(ip, alias=None):
         ip.alias_manager.define_alias(alias, staliases[alias])
 
 
-def refresh_variables(ip):
+def refresh_variables(ip, lazy=None):
+    """Restore the stored variables into the user namespace.
+
+    With lazy=True every variable is bound to a `LazyValue` placeholder,
+    without reading the database; with lazy=False every variable is loaded.
+    By default, pickled variables are loaded and those saved as files get a
+    placeholder.
+    """
     db = ip.db
+    index = db.get('stored_index', {}) if lazy else {}
     for key in db.keys('autorestore/*'):
         # strip autorestore
         justkey = os.path.basename(key)
+        if lazy:
+            info = index.get(justkey, {})
+            ip.user_ns[justkey] = LazyValue(ip, justkey, info.get('type'))
+            continue
         try:
             obj = db[key]
         except KeyError:
@@ -44,6 +647,11 @@ def refresh_variables(ip):
             print("The error was:", sys.exc_info()[0])
         else:
             #print "restored",justkey,"=",obj #dbg
+            if isinstance(obj, StoredReference):
+                if lazy is None:
+                    obj = LazyValue(ip, justkey, obj.typename)
+                else:
+                    obj = obj.load(ip)
             ip.user_ns[justkey] = obj
 
 
@@ -51,8 +659,8 @@ def restore_dhist(ip):
     ip.user_ns['_dh'] = ip.db.get('dhist',[])
 
 
-def restore_data(ip):
-    refresh_variables(ip)
+def restore_data(ip, lazy=None):
+    refresh_variables(ip, lazy)
     restore_aliases(ip)
     restore_dhist(ip)
 
@@ -69,11 +677,44 @@ class StoreMagics(Magics):
         """
     ).tag(config=True)
 
+    backend = Enum(['pickle', 'binary', 'chunked'], 'pickle', help=
+        """How %store saves variables. 'pickle' pickles them in IPython's
+        database; 'binary' saves NumPy arrays and pandas DataFrames as .npy
+        files which are memory-mapped, and restored lazily, when loaded
+        (other values are pickled in the database); 'chunked' pickles them
+        into content-addressed chunk files, so that storing a value again
+        only writes the chunks that changed.
+        """
+    ).tag(config=True)
+
+    compression = Enum(list(compressors), 'none', help=
+        """Compression of the chunk files written by the 'chunked' backend."""
+    ).tag(config=True)
+
+    lazy_restore = Bool(False, help=
+        """If True, restored variables are bound to placeholders that load
+        the stored value when a cell first uses them, so that restoring
+        doesn't read the stored values. Use %store -r --eager to load them
+        all at once. Code that reaches a placeholder other than through a
+        cell, e.g. with %run -i, still sees the placeholder in identity and
+        type/isinstance checks.
+        """
+    ).tag(config=True)
+
     def __init__(self, shell):
         super(StoreMagics, self).__init__(shell=shell)
         self.shell.configurables.append(self)
         if self.autorestore:
-            restore_data(self.shell)
+            restore_data(self.shell, self._lazy())
+
+    def _lazy(self, eager=False):
+        if eager:
+            return False
+        return True if self.lazy_restore else None
+
+    def pre_run_cell(self, info):
+        """Load the lazily restored variables used by the cell to run"""
+        load_lazy_variables(self.shell, info.raw_cell or '')
 
     @skip_doctest
     @line_magic
@@ -100,16 +741,25 @@ class StoreMagics(Magics):
 
         * ``%store``          - Show list of all variables and their current
                                 values
+        * ``%store -l``       - Show list of all variables with their type,
+                                size, shape or length and when they were stored
         * ``%store spam bar`` - Store the *current* value of the variables spam
                                 and bar to disk
         * ``%store -d spam``  - Remove the variable and its value from storage
         * ``%store -z``       - Remove all variables from storage
         * ``%store -r``       - Refresh all variables, aliases and directory history
                                 from store (overwrite current vals)
+        * ``%store -r --eager`` - Same, but load every variable now even if
+                                  lazy restore is enabled
         * ``%store -r spam bar`` - Refresh specified variables and aliases from store
                                    (delete current val)
         * ``%store foo >a.txt``  - Store value of foo to new file a.txt
         * ``%store foo >>a.txt`` - Append value of foo to file a.txt
+        * ``%store -f csv foo >a.csv`` - Store value of foo to a.csv in the
+                                  given format: text, csv, jsonl, npy or raw.
+                                  Without -f, the format is guessed from the
+                                  file extension; DataFrames are written as
+                                  csv, other values are pretty-printed.
 
         It should be noted that if you change the value of a variable, you
         need to %store it again if you want to persist the new value.
@@ -121,7 +771,7 @@ class StoreMagics(Magics):
         To remove an alias from the storage, use the %unalias magic.
         """
 
-        opts,argsl = self.parse_options(parameter_s,'drz',mode='string')
+        opts,argsl = self.parse_options(parameter_s,'drzlf:','eager',mode='string')
         args = argsl.split()
         ip = self.shell
         db = ip.db
@@ -136,16 +786,28 @@ class StoreMagics(Magics):
                     del db['autorestore/' + todel]
                 except BaseException as e:
                     raise UsageError("Can't delete variable '%s'" % todel) from e
+                remove_files(ip, todel)
+                index = db.get('stored_index', {})
+                if index.pop(todel, None) is not None:
+                    db['stored_index'] = index
+                # a placeholder can't be loaded anymore
+                if isinstance(ip.user_ns.get(todel), LazyValue):
+                    del ip.user_ns[todel]
         # reset
         elif 'z' in opts:
             for k in db.keys('autorestore/*'):
                 del db[k]
+                name = os.path.basename(k)
+                remove_files(ip, name)
+                if isinstance(ip.user_ns.get(name), LazyValue):
+                    del ip.user_ns[name]
+            db['stored_index'] = {}
 
         elif 'r' in opts:
             if args:
                 for arg in args:
                     try:
-                        obj = db['autorestore/' + arg]
+                        obj = load_variable(ip, arg)
                     except KeyError:
                         try:
                             restore_aliases(ip, alias=arg)
@@ -154,7 +816,7 @@ class StoreMagics(Magics):
                     else:
                         ip.user_ns[arg] = obj
             else:
-                restore_data(ip)
+                restore_data(ip, self._lazy('eager' in opts))
 
         # run without arguments -> list variables & values
         elif not args:
@@ -165,36 +827,47 @@ class StoreMagics(Magics):
             else:
                 size = 0
 
+            index = db.get('stored_index', {})
+            get = db.get
+            if 'l' in opts:
+                print('Stored variables:')
+                fmt = '%-'+str(size)+'s  %-12s %10s  %-16s %s'
+                print(fmt % ('Name', 'Type', 'Size', 'Shape/len', 'Stored'))
+                for var in vars:
+                    justkey = os.path.basename(var)
+                    info = index.get(justkey)
+                    if info is None:
+                        print(fmt % (justkey, '?', '?', '?', '?'))
+                        continue
+                    size_str = '?' if info['size'] is None else _format_size(info['size'])
+                    shape = '' if info['shape'] is None else str(info['shape'])
+                    stored = time.strftime('%Y-%m-%d %H:%M:%S',
+                                           time.localtime(info['time']))
+                    print(fmt % (justkey, info['type'], size_str, shape, stored))
+                return
+
             print('Stored variables and their in-db values:')
             fmt = '%-'+str(size)+'s -> %s'
-            get = db.get
             for var in vars:
                 justkey = os.path.basename(var)
-                # print 30 first characters from every var
-                print(fmt % (justkey, repr(get(var, '<unavailable>'))[:50]))
+                try:
+                    value_repr = index[justkey]['repr']
+                except KeyError:
+                    # stored before the index existed: load it
+                    # print 30 first characters from every var
+                    value_repr = repr(get(var, '<unavailable>'))[:50]
+                print(fmt % (justkey, value_repr))
 
         # default action - store the variable
         else:
             # %store foo >file.txt or >>file.txt
             if len(args) > 1 and args[1].startswith(">"):
                 fnam = os.path.expanduser(args[1].lstrip(">").lstrip())
-                if args[1].startswith(">>"):
-                    fil = open(fnam, "a", encoding="utf-8")
-                else:
-                    fil = open(fnam, "w", encoding="utf-8")
-                with fil:
-                    obj = ip.ev(args[0])
-                    print("Writing '%s' (%s) to file '%s'." % (args[0],
-                        obj.__class__.__name__, fnam))
-
-                    if not isinstance (obj, str):
-                        from pprint import pprint
-                        pprint(obj, fil)
-                    else:
-                        fil.write(obj)
-                        if not obj.endswith('\n'):
-                            fil.write('\n')
-
+                obj = ip.ev(args[0])
+                print("Writing '%s' (%s) to file '%s'." % (args[0],
+                    obj.__class__.__name__, fnam))
+                write_to_file(obj, fnam, append=args[1].startswith(">>"),
+                              fmt=opts.get('f'))
                 return
 
             # %store foo
@@ -225,12 +898,66 @@ class StoreMagics(Magics):
                         of classes in real modules on file system can be %%store'd.
                         """ % (arg, obj) ))
                         return
-                    #pickled = pickle.dumps(obj)
-                    db[ 'autorestore/' + arg ] = obj
-                    print("Stored '%s' (%s)" % (arg, obj.__class__.__name__))
+                    start = time.perf_counter()
+                    written = self._store_variable(arg, obj)
+                    elapsed = time.perf_counter() - start
+                    if written is None:
+                        print("Stored '%s' (%s)" % (arg, obj.__class__.__name__))
+                    else:
+                        print("Stored '%s' (%s) - %s written in %.1f ms" % (
+                            arg, obj.__class__.__name__, _format_size(written),
+                            elapsed * 1e3))
+
+    def _store_variable(self, name, obj):
+        """Save obj as stored variable name with the configured backend,
+        and record it in the 'stored_index' database key.
+
+        Returns the number of bytes written, or None if unknown.
+        """
+        ip = self.shell
+        db = ip.db
+        key = 'autorestore/' + name
+        ref = None
+        if self.backend == 'chunked':
+            ref, written = save_chunks(ip, name, obj, self.compression)
+            db[key] = ref
+            prune_chunks(ip, ref)
+            remove_files(ip, name, keep=ref.dirname)
+            size = _dir_size(os.path.join(store_dir(ip), ref.dirname))
+        else:
+            if self.backend == 'binary':
+                ref = save_files(ip, name, obj)
+            if ref is not None:
+                db[key] = ref
+                size = written = _dir_size(os.path.join(store_dir(ip), ref.dirname))
+            else:
+                #pickled = pickle.dumps(obj)
+                db[key] = obj
+                remove_files(ip, name)
+                try:
+                    size = written = os.path.getsize(os.path.join(db.root, key))
+                except (AttributeError, OSError):
+                    size = written = None
+
+        index = db.get('stored_index', {})
+        index[name] = describe(obj, size)
+        db['stored_index'] = index
+        return written
 
 
 def load_ipython_extension(ip):
     """Load the extension in IPython."""
     ip.register_magics(StoreMagics)
+    magics = ip.magics_manager.registry['StoreMagics']
+    ip.events.register('pre_run_cell', magics.pre_run_cell)
+
+
+def unload_ipython_extension(ip):
+    """Unload the extension from IPython."""
+    magics = ip.magics_manager.registry.get('StoreMagics')
+    if magics is not None:
+        try:
+            ip.events.unregister('pre_run_cell', magics.pre_run_cell)
+        except ValueError:
+            pass
 
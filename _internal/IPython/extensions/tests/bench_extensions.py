@@ -0,0 +1,326 @@
+"""Benchmarks for the autoreload and storemagic extensions.
+
+Run with::
+
+    python -m IPython.extensions.tests.bench_extensions -o results.json
+
+The results are written as JSON, with the parameters used, so that runs made
+before and after a change can be compared. Payloads needing NumPy or pandas
+are skipped when those aren't installed.
+"""
+# -----------------------------------------------------------------------------
+#  Copyright (c) IPython Development Team.
+#
+#  Distributed under the terms of the Modified BSD License.
+#
+#  The full license is in the file COPYING.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import textwrap
+import time
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+
+
+def timeit(func, repeat, setup=None):
+    """Time func() repeat times, calling setup() untimed before each run"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "max": max(times),
+        "repeat": repeat,
+    }
+
+
+def module_source(n_classes, n_functions, version=0):
+    """Source of a synthetic module; version changes the body of func0"""
+    lines = []
+    for i in range(n_functions):
+        result = version if i == 0 else i
+        lines.append(f"def func{i}(a, b=1):\n    return a + b + {result}\n")
+    for i in range(n_classes):
+        lines.append(
+            textwrap.dedent(
+                f"""
+                class Class{i}:
+                    attr = {i}
+
+                    def __init__(self, value=0):
+                        self.value = value
+
+                    def method(self):
+                        return self.value + {i}
+
+                    @property
+                    def prop(self):
+                        return self.value
+                """
+            )
+        )
+    return "\n".join(lines)
+
+
+def bump_mtime(filename):
+    """Make filename look modified without waiting for the clock to tick"""
+    mtime = os.stat(filename).st_mtime + 2
+    os.utime(filename, (mtime, mtime))
+
+
+class ModuleTree:
+    """A temporary package of synthetic modules on sys.path"""
+
+    def __init__(self, n_modules, n_classes, n_functions):
+        self.n_classes = n_classes
+        self.n_functions = n_functions
+        self.dir = tempfile.mkdtemp()
+        self.package = "benchpkg_%x" % time.time_ns()
+        pkg_dir = os.path.join(self.dir, self.package)
+        os.mkdir(pkg_dir)
+        open(os.path.join(pkg_dir, "__init__.py"), "w", encoding="utf-8").close()
+        self.names = []
+        for i in range(n_modules):
+            name = f"{self.package}.mod{i}"
+            self.write(name, 0)
+            self.names.append(name)
+        sys.path.insert(0, self.dir)
+        for name in self.names:
+            importlib.import_module(name)
+
+    def filename(self, name):
+        return os.path.join(self.dir, *name.split(".")) + ".py"
+
+    def write(self, name, version):
+        with open(self.filename(name), "w", encoding="utf-8") as f:
+            f.write(module_source(self.n_classes, self.n_functions, version))
+
+    def close(self):
+        sys.path.remove(self.dir)
+        for name in list(sys.modules):
+            if name.startswith(self.package):
+                del sys.modules[name]
+        shutil.rmtree(self.dir)
+
+
+# -----------------------------------------------------------------------------
+# autoreload
+# -----------------------------------------------------------------------------
+
+
+def bench_autoreload(args):
+    from IPython.extensions import autoreload
+
+    results = {}
+    tree = ModuleTree(args.modules, args.classes, args.functions)
+    try:
+        results["reloader_init"] = timeit(autoreload.ModuleReloader, args.repeat)
+
+        reloader = autoreload.ModuleReloader()
+        reloader.enabled = True
+        reloader.check_all = True
+        reloader.check()  # first check caches the mtimes
+        results["check_no_change"] = timeit(reloader.check, args.repeat)
+
+        # edit one function of one module
+        name = tree.names[0]
+        versions = iter(range(1, args.repeat + 1))
+
+        def edit_function():
+            tree.write(name, next(versions))
+            bump_mtime(tree.filename(name))
+
+        results["check_single_file_change"] = timeit(
+            reloader.check, args.repeat, setup=edit_function
+        )
+
+        # swap the class of many live instances
+        module = sys.modules[name]
+        instances = []
+
+        def make_instances():
+            instances[:] = [module.Class0(i) for i in range(args.instances)]
+
+        results["update_instances"] = timeit(
+            lambda: autoreload.update_instances(module.Class0, module.Class1),
+            args.repeat,
+            setup=make_instances,
+        )
+
+        # edit a class with many live instances
+        source = module_source(args.classes, args.functions)
+        counter = iter(range(1, args.repeat + 1))
+
+        def edit_class():
+            make_instances()
+            with open(tree.filename(name), "w", encoding="utf-8") as f:
+                f.write(source.replace("attr = 0", "attr = %d" % -next(counter)))
+            bump_mtime(tree.filename(name))
+
+        results["check_class_change"] = timeit(
+            reloader.check, args.repeat, setup=edit_class
+        )
+    finally:
+        tree.close()
+    return results
+
+
+# -----------------------------------------------------------------------------
+# storemagic
+# -----------------------------------------------------------------------------
+
+
+def payloads(sizes):
+    """Synthetic values to %store, by name"""
+    values = {}
+    for n in sizes:
+        values[f"list_{n}"] = list(range(n))
+    try:
+        import numpy as np
+    except ImportError:
+        return values
+    for n in sizes:
+        values[f"array_{n}"] = np.arange(n, dtype=float)
+    try:
+        import pandas as pd
+    except ImportError:
+        return values
+    for n in sizes:
+        values[f"frame_{n}"] = pd.DataFrame(
+            {
+                "date": pd.date_range("2000-01-01", periods=n, freq="h"),
+                "amount": np.arange(n, dtype=float),
+                "branch": np.arange(n) % 50,
+            }
+        )
+    return values
+
+
+def bench_storemagic(args):
+    from IPython.testing.globalipapp import get_ipython
+    from traitlets.config.loader import Config
+
+    ip = get_ipython()
+    ip.extension_manager.load_extension("storemagic")
+    magics = ip.magics_manager.registry["StoreMagics"]
+
+    results = {}
+    values = payloads(args.sizes)
+    for backend in args.backends:
+        magics.backend = backend
+        ip.run_line_magic("store", "-z")
+        for name, value in values.items():
+            ip.user_ns[name] = value
+            results[f"{backend}/store/{name}"] = timeit(
+                lambda: magics._store_variable(name, value), args.repeat
+            )
+            results[f"{backend}/restore/{name}"] = timeit(
+                lambda: ip.run_line_magic("store", "-r " + name), args.repeat
+            )
+
+        results[f"{backend}/list"] = timeit(
+            lambda: ip.run_line_magic("store", ""), args.repeat
+        )
+
+        orig_config = ip.config
+        for lazy in (False, True):
+            c = Config()
+            c.StoreMagics.autorestore = True
+            c.StoreMagics.lazy_restore = lazy
+            c.StoreMagics.backend = backend
+            ip.config = c
+            try:
+                results[
+                    "%s/autorestore%s" % (backend, "_lazy" if lazy else "")
+                ] = timeit(
+                    lambda: ip.extension_manager.reload_extension("storemagic"),
+                    args.repeat,
+                )
+            finally:
+                ip.config = orig_config
+                ip.extension_manager.reload_extension("storemagic")
+        magics = ip.magics_manager.registry["StoreMagics"]
+        ip.run_line_magic("store", "-z")
+
+    for name in values:
+        ip.user_ns.pop(name, None)
+    return results
+
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=int, default=50)
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--functions", type=int, default=50)
+    parser.add_argument("--instances", type=int, default=10000)
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(n) for n in s.split(",")],
+        default=[1000, 100000],
+        help="comma separated sizes of the %%store payloads",
+    )
+    parser.add_argument(
+        "--backends",
+        type=lambda s: s.split(","),
+        default=["pickle", "binary", "chunked"],
+        help="comma separated %%store backends",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only", choices=["autoreload", "storemagic"], help="run one suite only"
+    )
+    parser.add_argument("-o", "--output", help="write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    if args.only != "autoreload":
+        # keep the stored variables away from the user's profile
+        os.environ["IPYTHONDIR"] = tempfile.mkdtemp()
+
+    results = {
+        "meta": {
+            "python": sys.version,
+            "platform": platform.platform(),
+            "time": time.time(),
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+    }
+    if args.only != "storemagic":
+        results["autoreload"] = bench_autoreload(args)
+    if args.only != "autoreload":
+        # %store prints what it does; keep that out of the JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["storemagic"] = bench_storemagic(args)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
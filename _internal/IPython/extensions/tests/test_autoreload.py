@@ -12,6 +12,7 @@
 # Imports
 # -----------------------------------------------------------------------------
 
+import importlib
 import os
 import platform
 import pytest
@@ -28,7 +29,7 @@ import IPython.testing.tools as tt
 
 from unittest import TestCase
 
-from IPython.extensions.autoreload import AutoreloadMagics
+from IPython.extensions.autoreload import AutoreloadMagics, ImportRecorder
 from IPython.core.events import EventManager, pre_run_cell
 from IPython.testing.decorators import skipif_not_numpy
 
@@ -484,6 +485,238 @@ class TestAutoreload(Fixture):
             self.shell.run_code("pass")
         assert lo.output == [f"INFO:autoreload:Reloading '{mod_name}'."]
 
+    def test_autoreload_profile(self):
+        self.shell.magic_autoreload("2 --profile")
+        mod_code = """
+        class Cls:
+            def meth(self):
+                return 1
+        def func(): pass
+        """
+        mod_name, mod_fn = self.new_module(mod_code)
+        self.shell.run_code(f"import {mod_name}")
+        self.write_file(mod_fn, mod_code.replace("1", "2").replace("pass", "return"))
+        self.shell.run_code("pass")
+
+        stats = self.shell.auto_magics._reloader.stats
+        assert len(stats) == 2
+        assert stats[0].reloaded == []
+        assert stats[0].stat_count > 0
+        assert [name for name, _ in stats[1].reloaded] == [mod_name]
+        assert stats[1].classes >= 1
+        assert stats[1].functions >= 2
+
+        with tt.AssertPrints("modules reloaded:  1", channel="stdout"):
+            self.shell.magic_autoreload("stats")
+
+        # stats does not change the mode, profiling stays on
+        self.shell.run_code("pass")
+        assert len(stats) == 3
+
+        self.shell.magic_autoreload("2")
+        self.shell.run_code("pass")
+        assert len(stats) == 3
+
+    def test_autoreload_background(self):
+        self.shell.magic_autoreload("2 --background")
+        watcher = self.shell.auto_magics._watcher
+        try:
+            assert watcher.running
+            mod_name, mod_fn = self.new_module(
+                """
+                def func():
+                    return 'old'
+                """
+            )
+            self.shell.run_code(f"from {mod_name} import func")
+            self.shell.run_code("assert func() == 'old'")
+
+            self.write_file(
+                mod_fn,
+                """
+                def func():
+                    return 'new'
+                """,
+            )
+            watcher.scan()
+            assert mod_name in watcher._pending
+            self.shell.run_code("assert func() == 'new'")
+            assert not watcher._pending
+
+            # no scans while a cell runs
+            self.shell.user_ns["watcher"] = watcher
+            self.shell.run_code("assert not watcher._idle.is_set()")
+            assert watcher._idle.is_set()
+        finally:
+            self.shell.magic_autoreload("2")
+        assert not watcher.running
+
+    def test_post_execute_only_looks_at_new_imports(self):
+        reloader = self.shell.auto_magics._reloader
+        seen = []
+        filename_and_mtime = reloader.filename_and_mtime
+
+        def recording_filename_and_mtime(module):
+            seen.append(module.__name__)
+            return filename_and_mtime(module)
+
+        reloader.filename_and_mtime = recording_filename_and_mtime
+        self.shell.magic_autoreload("1")
+        self.shell.run_code("x = 1")
+        assert seen == []
+
+        mod_name, mod_fn = self.new_module("x = 1")
+        self.shell.run_code(f"import {mod_name}")
+        assert seen == [mod_name]
+        assert mod_name in reloader.modules_mtimes
+
+        seen.clear()
+        self.shell.run_code(f"import {mod_name}")
+        assert seen == []
+
+    def test_import_recorder_only_while_enabled(self):
+        magics = self.shell.auto_magics
+        self.shell.magic_autoreload("2")
+        recorder = magics._imports
+        assert any(finder is recorder for finder in sys.meta_path)
+
+        # failed imports are recorded once, and dropped after the cell
+        self.shell.user_ns.update(recorder=recorder, magics=magics)
+        code = "try:\n    import no_such_module_xyz\nexcept ImportError:\n    pass\n"
+        self.shell.run_code(
+            code * 100 + "assert recorder._names[magics] == {'no_such_module_xyz'}"
+        )
+        assert recorder._names[magics] == set()
+
+        self.shell.magic_autoreload("0")
+        assert magics._imports is None
+        assert magics not in recorder._names
+
+        self.shell.magic_autoreload("2")
+        assert any(finder is magics._imports for finder in sys.meta_path)
+
+    def test_import_recorder_removed_when_unwatched(self):
+        class Consumer:
+            pass
+
+        recorder = ImportRecorder()
+        consumer = Consumer()
+        recorder.watch(consumer)
+        try:
+            assert sys.meta_path[0] is recorder
+            with pytest.raises(ImportError):
+                importlib.import_module("no_such_module_abc")
+            assert recorder.take(consumer) == {"no_such_module_abc"}
+            assert recorder.take(consumer) == ()
+        finally:
+            recorder.unwatch(consumer)
+        assert not any(finder is recorder for finder in sys.meta_path)
+
+    def test_modules_imported_before_loading(self):
+        mod_name, mod_fn = self.new_module(
+            """
+            def func():
+                return 'old'
+            """
+        )
+        self.shell.run_code(f"from {mod_name} import func")
+
+        # a new extension doesn't stat modules imported before it
+        self.shell = FakeShell()
+        self.shell.run_code(f"from {mod_name} import func")
+        assert self.shell.auto_magics._reloader.modules_mtimes == {}
+
+        # but still reloads them once modified
+        self.shell.magic_autoreload("2")
+        self.shell.run_code("pass")
+        self.shell.run_code("assert func() == 'old'")
+        self.write_file(
+            mod_fn,
+            """
+            def func():
+                return 'new'
+            """,
+        )
+        self.shell.run_code("assert func() == 'new'")
+
+    def test_reload_skips_unchanged_definitions(self):
+        self.shell.magic_autoreload("2 --profile")
+        mod_code = """
+        import pickle
+
+        class Base:
+            def meth(self):
+                return 'base'
+
+        class Child(Base):
+            def meth(self):
+                return 'child'
+
+        DEFAULT = Base()
+
+        def func():
+            return 'old'
+        """
+        mod_name, mod_fn = self.new_module(mod_code)
+        self.shell.run_code(f"import {mod_name} as mod")
+        self.shell.run_code("base = mod.Base(); child = mod.Child()")
+        self.shell.run_code("default = mod.DEFAULT; old_func = mod.func")
+        self.shell.run_code("line = mod.Base.meth.__code__.co_firstlineno")
+
+        # Base doesn't change, but moves down: only Child and func are patched
+        self.write_file(
+            mod_fn,
+            "\n\n"
+            + mod_code.replace("'child'", "'new child'").replace("'old'", "'new'"),
+        )
+        self.shell.run_code("pass")
+        stats = self.shell.auto_magics._reloader.stats[-1]
+        assert [name for name, _ in stats.reloaded] == [mod_name]
+        assert stats.classes == 2  # Child, listed twice in old_objects
+
+        self.shell.run_code("assert type(base) is mod.Base")
+        self.shell.run_code("assert type(mod.DEFAULT) is mod.Base")
+        self.shell.run_code("assert isinstance(child, mod.Child)")
+        self.shell.run_code("assert isinstance(child, mod.Base)")
+        self.shell.run_code("assert isinstance(mod.Child(), mod.Base)")
+        self.shell.run_code("assert child.meth() == 'new child'")
+        self.shell.run_code("assert old_func() == 'new'")
+        self.shell.run_code("import pickle; pickle.dumps(base)")
+        self.shell.run_code("assert base.meth.__code__.co_firstlineno == line + 2")
+
+    def test_reload_skip_keeps_class_identity(self):
+        self.shell.magic_autoreload("2")
+        mod_code = """
+        class Base:
+            pass
+
+        class Other:
+            pass
+
+        REGISTRY = {'base': Base}
+
+        def make(cls=Base):
+            return cls()
+
+        def func():
+            return 'old'
+        """
+        mod_name, mod_fn = self.new_module(mod_code)
+        self.shell.run_code(f"import {mod_name} as mod")
+        self.shell.run_code("other = mod.Other(); old_make = mod.make")
+
+        self.write_file(mod_fn, mod_code.replace("'old'", "'new'"))
+        self.shell.run_code("pass")
+
+        self.shell.run_code("assert mod.func() == 'new'")
+        # Base is referenced from the new REGISTRY and make's defaults
+        self.shell.run_code("assert mod.REGISTRY['base'] is mod.Base")
+        self.shell.run_code("assert isinstance(mod.REGISTRY['base'](), mod.Base)")
+        self.shell.run_code("assert isinstance(mod.make(), mod.Base)")
+        self.shell.run_code("assert isinstance(old_make(), mod.Base)")
+        # Other is only referenced from the module, and is kept
+        self.shell.run_code("assert type(other) is mod.Other")
+
     def _check_smoketest(self, use_aimport=True):
         """
         Functional test for the automatic reloader using either
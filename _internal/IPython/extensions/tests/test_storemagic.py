@@ -1,8 +1,13 @@
-import tempfile, os
+import glob, shutil, tempfile, os
 from pathlib import Path
 
+import pytest
 from traitlets.config.loader import Config
 
+import IPython.testing.tools as tt
+from IPython.core.error import UsageError
+from IPython.extensions import storemagic
+
 
 def setup_module():
     ip.magic('load_ext storemagic')
@@ -64,3 +69,266 @@ def test_autorestore():
         assert ip.user_ns["foo"] == 95
     finally:
         ip.config = orig_config
+
+def test_store_binary():
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    magics = ip.magics_manager.registry["StoreMagics"]
+    magics.backend = "binary"
+    try:
+        ip.user_ns["arr"] = np.arange(10.0)
+        ip.user_ns["frame"] = pd.DataFrame(
+            {"amount": [1.5, 2.5], "memo": ["a", "b"]}, index=["x", "y"]
+        )
+        ip.magic("store arr frame")
+        assert isinstance(ip.db["autorestore/arr"], storemagic.StoredFiles)
+        assert isinstance(ip.db["autorestore/frame"], storemagic.StoredFiles)
+
+        # restoring by name loads the value right away
+        del ip.user_ns["arr"]
+        ip.magic("store -r arr")
+        assert isinstance(ip.user_ns["arr"], np.memmap)
+        assert ip.user_ns["arr"].sum() == 45.0
+
+        # restoring everything binds placeholders, loaded on first use
+        ip.magic("store -r")
+        assert isinstance(ip.user_ns["frame"], storemagic.LazyValue)
+        ip.run_cell("total = frame['amount'].sum()")
+        assert ip.user_ns["total"] == 4.0
+        pd.testing.assert_frame_equal(
+            ip.user_ns["frame"],
+            pd.DataFrame({"amount": [1.5, 2.5], "memo": ["a", "b"]}, index=["x", "y"]),
+        )
+
+        # storing again replaces the files
+        ip.user_ns["arr"] = np.arange(3)
+        ip.magic("store arr")
+        assert len(glob.glob(os.path.join(storemagic.store_dir(ip), "arr.*"))) == 1
+
+        ip.magic("store -d arr")
+        ip.magic("store -d frame")
+        assert glob.glob(os.path.join(storemagic.store_dir(ip), "arr.*")) == []
+        assert glob.glob(os.path.join(storemagic.store_dir(ip), "frame.*")) == []
+    finally:
+        magics.backend = "pickle"
+        ip.user_ns.pop("arr", None)
+        ip.user_ns.pop("frame", None)
+        ip.user_ns.pop("total", None)
+
+
+def test_lazy_restore():
+    ip.user_ns["foo"] = [96]
+    ip.magic("store foo")
+    del ip.user_ns["foo"]
+    c = Config()
+    c.StoreMagics.autorestore = True
+    c.StoreMagics.lazy_restore = True
+    orig_config = ip.config
+    try:
+        ip.config = c
+        ip.extension_manager.reload_extension("storemagic")
+        assert isinstance(ip.user_ns["foo"], storemagic.LazyValue)
+        ip.run_cell("bar = foo + [1]")
+        assert ip.user_ns["foo"] == [96]
+        assert ip.user_ns["bar"] == [96, 1]
+
+        ip.magic("store -r")
+        assert isinstance(ip.user_ns["foo"], storemagic.LazyValue)
+        # reached without the cell naming it, e.g. by a script run with -i
+        foo = ip.user_ns["foo"]
+        assert len(foo) == 1
+        assert foo[0] == 96
+        assert list(foo) == [96]
+        assert foo + [1] == [96, 1]
+        assert [0] + foo == [0, 96]
+        assert foo == [96]
+        assert bool(foo)
+        assert ip.user_ns["foo"] == [96]
+
+        ip.magic("store -r")
+        ip.magic("store -r --eager")
+        assert ip.user_ns["foo"] == [96]
+    finally:
+        ip.config = orig_config
+        ip.extension_manager.reload_extension("storemagic")
+        ip.magic("store -d foo")
+        ip.user_ns.pop("foo", None)
+        ip.user_ns.pop("bar", None)
+
+
+def test_lazy_restore_only_loads_names_read():
+    ip.user_ns["big"] = [97]
+    ip.magic("store big")
+    # loading it would fail
+    with open(os.path.join(ip.db.root, "autorestore", "big"), "wb") as f:
+        f.write(b"not a pickle")
+    try:
+        ip.user_ns["big"] = storemagic.LazyValue(ip, "big")
+        with tt.AssertNotPrints("Unable to restore"):
+            ip.run_cell("# big\nx = 'big'")
+            ip.run_cell("y = 1  # big")
+        assert isinstance(ip.user_ns["big"], storemagic.LazyValue)
+
+        with tt.AssertNotPrints("Unable to restore"):
+            ip.run_cell("%store -d big")
+        assert "big" not in ip.user_ns
+
+        ip.user_ns["big"] = storemagic.LazyValue(ip, "big")
+        with tt.AssertNotPrints("Unable to restore"):
+            ip.run_cell("del big")
+        assert "big" not in ip.user_ns
+    finally:
+        ip.user_ns.pop("big", None)
+        ip.user_ns.pop("x", None)
+        ip.user_ns.pop("y", None)
+        ip.db.pop("autorestore/big", None)
+
+
+def test_store_chunked():
+    magics = ip.magics_manager.registry["StoreMagics"]
+    magics.backend = "chunked"
+    chunk_size = storemagic.CHUNK_SIZE
+    path = os.path.join(storemagic.store_dir(ip), "blob.chunks")
+    try:
+        blob = bytearray(os.urandom(3 * chunk_size + 10))
+        written = magics._store_variable("blob", blob)
+        assert written > 3 * chunk_size
+        assert len(os.listdir(path)) == 4
+
+        # only the chunk that changed is written again
+        blob[chunk_size + 1] ^= 0xFF
+        written = magics._store_variable("blob", blob)
+        assert written == chunk_size
+        assert len(os.listdir(path)) == 4
+        assert storemagic.load_variable(ip, "blob") == blob
+
+        magics.compression = "zlib"
+        ip.user_ns["blob"] = bytearray(3 * chunk_size)
+        ip.magic("store blob")
+        assert all(name.endswith(".z") for name in os.listdir(path))
+        del ip.user_ns["blob"]
+        ip.magic("store -r blob")
+        assert ip.user_ns["blob"] == bytearray(3 * chunk_size)
+
+        ip.magic("store -d blob")
+        assert not os.path.exists(path)
+    finally:
+        magics.backend = "pickle"
+        magics.compression = "none"
+        ip.user_ns.pop("blob", None)
+
+
+def test_store_list_uses_index():
+    ip.user_ns["ledger"] = list(range(1000))
+    ip.magic("store ledger")
+    try:
+        info = ip.db["stored_index"]["ledger"]
+        assert info["type"] == "list"
+        assert info["shape"] == 1000
+        assert info["size"] > 0
+        # the repr is built for the first elements only
+        assert info["repr"] == "[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]"
+
+        # listing must not unpickle the stored value
+        with open(os.path.join(ip.db.root, "autorestore", "ledger"), "wb") as f:
+            f.write(b"not a pickle")
+        with tt.AssertPrints("-> [0, 1, 2, 3"):
+            ip.magic("store")
+        with tt.AssertPrints("1000"):
+            ip.magic("store -l")
+    finally:
+        ip.magic("store -d ledger")
+        ip.user_ns.pop("ledger", None)
+    assert "ledger" not in ip.db["stored_index"]
+
+
+def test_store_to_file_formats():
+    tmpd = tempfile.mkdtemp()
+    try:
+        ip.user_ns["rows"] = [{"amount": 1}, {"amount": 2}]
+        path = os.path.join(tmpd, "rows.jsonl")
+        ip.magic("store rows >" + path)
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == '{"amount": 1}\n{"amount": 2}\n'
+
+        path = os.path.join(tmpd, "rows.txt")
+        ip.magic("store -f csv rows >" + path)
+        ip.user_ns["rows"] = [(1, "a"), (2, "b")]
+        ip.magic("store -f csv rows >" + path)
+        ip.magic("store -f csv rows >>" + path)
+        with open(path, encoding="utf-8") as f:
+            assert f.read().splitlines() == ["1,a", "2,b", "1,a", "2,b"]
+
+        with pytest.raises(UsageError):
+            ip.magic("store -f xml rows >" + path)
+
+        # strings are written verbatim, whatever the extension or format
+        text = "date,amount\n2024-01-01,5\n"
+        for name in ("text.csv", "text.jsonl"):
+            storemagic.write_to_file(text, os.path.join(tmpd, name))
+            with open(os.path.join(tmpd, name), encoding="utf-8") as f:
+                assert f.read() == text
+        storemagic.write_to_file(text, os.path.join(tmpd, "text.csv"), fmt="jsonl")
+        with open(os.path.join(tmpd, "text.csv"), encoding="utf-8") as f:
+            assert f.read() == text
+        # but not split in characters as rows
+        for name in ("names.csv", "names.jsonl"):
+            with pytest.raises(UsageError):
+                storemagic.write_to_file(["food", "rent"], os.path.join(tmpd, name))
+
+        # a value the format rejects leaves the existing file alone
+        path = os.path.join(tmpd, "data.csv")
+        ip.magic("store rows >" + path)
+        ip.user_ns["flat"] = [1, 2, 3]
+        with pytest.raises(UsageError):
+            ip.magic("store flat >" + path)
+        ip.user_ns["flat"] = [(3, "c"), 4]
+        with pytest.raises(UsageError):
+            ip.magic("store flat >>" + path)
+        with open(path, encoding="utf-8") as f:
+            assert f.read().splitlines() == ["1,a", "2,b"]
+        with pytest.raises(UsageError):
+            storemagic.write_to_file([1, 2, 3], path, fmt="npy")
+        with open(path, encoding="utf-8") as f:
+            assert f.read().splitlines() == ["1,a", "2,b"]
+        # and no temporary file behind
+        assert sorted(os.listdir(tmpd)) == [
+            "data.csv", "rows.jsonl", "rows.txt", "text.csv", "text.jsonl"
+        ]
+
+        # the file is written in place, e.g. through a symlink
+        link = os.path.join(tmpd, "link.csv")
+        os.symlink(path, link)
+        ip.user_ns["rows"] = [(3, "c")]
+        ip.magic("store rows >" + link)
+        assert os.path.islink(link)
+        with open(path, encoding="utf-8") as f:
+            assert f.read().splitlines() == ["3,c"]
+    finally:
+        ip.user_ns.pop("rows", None)
+        ip.user_ns.pop("flat", None)
+        shutil.rmtree(tmpd)
+
+
+def test_store_frame_to_file():
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    tmpd = tempfile.mkdtemp()
+    try:
+        ip.user_ns["frame"] = pd.DataFrame({"amount": [1, 2]})
+        path = os.path.join(tmpd, "frame.out")
+        ip.magic("store frame >" + path)
+        ip.magic("store frame >>" + path)
+        with open(path, encoding="utf-8") as f:
+            assert f.read().split() == [",amount", "0,1", "1,2", "0,1", "1,2"]
+
+        ip.user_ns["arr"] = np.arange(5)
+        path = os.path.join(tmpd, "arr.npy")
+        ip.magic("store arr >" + path)
+        np.testing.assert_array_equal(np.load(path), np.arange(5))
+        with pytest.raises(UsageError):
+            ip.magic("store arr >>" + path)
+    finally:
+        ip.user_ns.pop("frame", None)
+        ip.user_ns.pop("arr", None)
+        shutil.rmtree(tmpd)